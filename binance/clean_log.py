@@ -1,28 +1,48 @@
 #!/usr/bin/env python3
+import heapq
 import json
-from collections import Counter
+import mmap
+import os
 from pathlib import Path
-from typing import Optional, Set, Tuple
+from typing import Dict, Iterator, Optional, Set, Tuple, Union
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # orjson is optional, fall back to the stdlib decoder
+    orjson = None
 
-MARKER = "WS text frame: "
+try:
+    import numpy as np  # type: ignore
+    from numba import njit  # type: ignore
+except ImportError:  # numba is optional, scan_file falls back to mmap.find
+    njit = None
+
+
+MARKER = b"WS text frame: "
 DECODER = json.JSONDecoder()
 
 
-def parse_ws_frame_json(line: str) -> Optional[dict]:
+def parse_ws_payload(s: bytes) -> Optional[dict]:
     """
-    Extract and parse the JSON object right after 'WS text frame: '.
-    Works even if trailing text exists (e.g., 'group_id=...').
+    Parse the JSON object at the start of `s` (the text following MARKER).
     """
-    idx = line.find(MARKER)
-    if idx == -1:
-        return None
+    s = s.lstrip()
 
-    s = line[idx + len(MARKER):].lstrip()
-    try:
-        obj, _end = DECODER.raw_decode(s)
-    except json.JSONDecodeError:
-        return None
+    # Fast path: frames are single-line objects, so the last '}' usually
+    # closes the payload and orjson can parse the exact span.
+    obj = None
+    end = s.rfind(b"}")
+    if orjson is not None and end != -1:
+        try:
+            obj = orjson.loads(s[:end + 1])
+        except orjson.JSONDecodeError:
+            obj = None
+
+    if obj is None:
+        try:
+            obj, _end = DECODER.raw_decode(s.decode("utf-8", errors="replace"))
+        except json.JSONDecodeError:
+            return None
 
     if isinstance(obj, dict):
         return obj
@@ -48,22 +68,152 @@ def extract_symbols_from_payload(payload: dict) -> Set[str]:
     return out
 
 
-def scan_file(path: Path) -> Tuple[Set[str], int, int, Counter]:
+def iter_ws_payloads(buf: Union[bytes, mmap.mmap]) -> Iterator[bytes]:
+    """
+    Yield the text following MARKER up to the end of its line, for each
+    line containing MARKER. Lines without the marker are skipped by
+    `find` without ever being materialized.
+    """
+    size = len(buf)
+    pos = 0
+    while pos < size:
+        idx = buf.find(MARKER, pos)
+        if idx == -1:
+            return
+        start = idx + len(MARKER)
+        eol = buf.find(b"\n", start)
+        if eol == -1:
+            eol = size
+        yield buf[start:eol]
+        pos = eol + 1
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def find_frames(buf, marker):
+        """
+        Locate the JSON object following each marker in `buf` (uint8 array).
+        Returns parallel (start, end) offset arrays; buf[start:end] spans the
+        object including its braces. Lines where the object is missing or
+        unterminated are skipped. Works on raw bytes only (no str in nopython).
+        """
+        n = buf.shape[0]
+        m = marker.shape[0]
+        cap = 1024
+        starts = np.empty(cap, dtype=np.int64)
+        ends = np.empty(cap, dtype=np.int64)
+        count = 0
+        first = marker[0]
+
+        i = 0
+        while i <= n - m:
+            if buf[i] != first:
+                i += 1
+                continue
+            k = 1
+            while k < m and buf[i + k] == marker[k]:
+                k += 1
+            if k < m:
+                i += 1
+                continue
+
+            # Marker found: skip blanks, then walk the object tracking depth
+            j = i + m
+            while j < n and (buf[j] == 32 or buf[j] == 9):
+                j += 1
+            end = -1
+            if j < n and buf[j] == 123:  # '{'
+                depth = 0
+                in_str = False
+                escaped = False
+                t = j
+                while t < n and buf[t] != 10:  # stop at '\n'
+                    c = buf[t]
+                    if in_str:
+                        if escaped:
+                            escaped = False
+                        elif c == 92:  # '\\'
+                            escaped = True
+                        elif c == 34:  # '"'
+                            in_str = False
+                    elif c == 34:
+                        in_str = True
+                    elif c == 123:
+                        depth += 1
+                    elif c == 125:  # '}'
+                        depth -= 1
+                        if depth == 0:
+                            end = t + 1
+                            break
+                    t += 1
+
+            if end != -1:
+                if count == cap:
+                    cap *= 2
+                    new_starts = np.empty(cap, dtype=np.int64)
+                    new_ends = np.empty(cap, dtype=np.int64)
+                    new_starts[:count] = starts[:count]
+                    new_ends[:count] = ends[:count]
+                    starts = new_starts
+                    ends = new_ends
+                starts[count] = j
+                ends[count] = end
+                count += 1
+
+            # Only the first marker of a line counts: jump to the next line
+            while j < n and buf[j] != 10:
+                j += 1
+            i = j + 1
+
+        return starts[:count], ends[:count]
+
+
+def iter_frame_spans(mm: mmap.mmap) -> Iterator[bytes]:
+    """
+    Yield the JSON payload of each WS frame in `mm`, using the jitted
+    `find_frames` scanner when numba is available.
     """
+    if njit is None:
+        yield from iter_ws_payloads(mm)
+        return
+
+    buf = np.frombuffer(mm, dtype=np.uint8)
+    starts, ends = find_frames(buf, np.frombuffer(MARKER, dtype=np.uint8))
+    del buf  # release the buffer export so the mmap can be closed
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield mm[start:end]
+
+
+def scan_file(source: Union[Path, mmap.mmap]) -> Tuple[Set[str], int, int, Dict[str, int]]:
+    """
+    `source` is either a path to the log file or an already mapped buffer.
+
     Returns:
       - distinct symbols
       - matched lines (WS text frame lines that had a non-empty result list)
       - total symbol occurrences (sum of symbols per matched line)
-      - per-symbol occurrences (Counter)
+      - per-symbol occurrences (dict symbol -> count)
     """
     distinct_symbols: Set[str] = set()
     matched_lines = 0
     occurrences = 0
-    per_symbol = Counter()
+    per_symbol: Dict[str, int] = {}
+
+    if isinstance(source, mmap.mmap):
+        mm = source
+    else:
+        fd = os.open(source, os.O_RDONLY)
+        try:
+            if os.fstat(fd).st_size == 0:
+                return distinct_symbols, matched_lines, occurrences, per_symbol
+            mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
 
-    with path.open("r", encoding="utf-8", errors="replace") as f:
-        for line in f:
-            payload = parse_ws_frame_json(line)
+    try:
+        for raw in iter_frame_spans(mm):
+            payload = parse_ws_payload(raw)
             if not payload:
                 continue
 
@@ -75,7 +225,12 @@ def scan_file(path: Path) -> Tuple[Set[str], int, int, Counter]:
             matched_lines += 1
             occurrences += len(symbols)
             distinct_symbols.update(symbols)
-            per_symbol.update(symbols)
+            # Plain dict increments beat Counter.update for a handful of symbols
+            for sym in symbols:
+                per_symbol[sym] = per_symbol.get(sym, 0) + 1
+    finally:
+        if mm is not source:
+            mm.close()
 
     return distinct_symbols, matched_lines, occurrences, per_symbol
 
@@ -97,7 +252,7 @@ def main() -> None:
 
     # Optional: show the most frequent symbols
     print("\nTop 20 symbols by occurrence:")
-    for sym, cnt in per_symbol.most_common(20):
+    for sym, cnt in heapq.nlargest(20, per_symbol.items(), key=lambda kv: kv[1]):
         print(f"{sym}\t{cnt}")
 
 
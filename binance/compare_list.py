@@ -1,13 +1,86 @@
+import os
 import sys
+import json
 import argparse
+import tempfile
 from pathlib import Path
+from typing import Optional
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml bindings
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+
+def cache_path_for(yaml_path: Path) -> Path:
+    """Side-cache location for a YAML file: '<file>.yaml.cache.json'."""
+    return yaml_path.with_name(yaml_path.name + ".cache.json")
+
+
+def read_symbols_cache(cache_path: Path, st: os.stat_result) -> Optional[set[str]]:
+    """Return the cached symbols if the cache matches the YAML's (mtime, size)."""
+    try:
+        raw = cache_path.read_bytes()
+        cached = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(cached, dict):
+        return None
+    if cached.get("mtime") != st.st_mtime_ns or cached.get("size") != st.st_size:
+        return None
+
+    symbols = cached.get("symbols")
+    if not isinstance(symbols, list):
+        return None
+    return set(symbols)
+
+
+def write_symbols_cache(cache_path: Path, st: os.stat_result, symbols: set[str]) -> None:
+    """Atomically write the side-cache (temp file + os.replace). Best effort."""
+    payload = {"mtime": st.st_mtime_ns, "size": st.st_size, "symbols": sorted(symbols)}
+    data = orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode("utf-8")
+    try:
+        fd, tmp = tempfile.mkstemp(dir=cache_path.parent, prefix=cache_path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, cache_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        # A read-only directory just means no cache
+        pass
+
 
 def load_symbols(yaml_path: Path) -> set[str]:
-    """Load the 'symbols' list from a YAML file and return it as a set."""
-    with yaml_path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+    """
+    Load the 'symbols' list from a YAML file and return it as a set.
+    The normalized set is cached next to the YAML and reused while the
+    file's (mtime, size) is unchanged.
+    """
+    st = yaml_path.stat()
+    cache_path = cache_path_for(yaml_path)
+    cached = read_symbols_cache(cache_path, st)
+    if cached is not None:
+        return cached
+
+    symbols = parse_symbols_yaml(yaml_path)
+    write_symbols_cache(cache_path, st, symbols)
+    return symbols
+
+
+def parse_symbols_yaml(yaml_path: Path) -> set[str]:
+    """Parse the 'symbols' list from a YAML file and normalize it."""
+    with yaml_path.open("rb") as f:
+        data = yaml.load(f, Loader=SafeLoader) or {}
 
     symbols = data.get("symbols", [])
     if symbols is None:
@@ -1,46 +1,53 @@
 import asyncio
-import json
+import collections
+import csv
 import time
+import orjson  # type: ignore
 import websockets  # type: ignore
-import pandas as pd  # type: ignore
 
 BINANCE_WS_URL = "wss://stream.binance.com:9443/ws"
+# Streams per SUBSCRIBE/UNSUBSCRIBE request (Binance caps the payload size)
+SUBSCRIBE_CHUNK = 200
 
 
-async def subscribe_to_streams(ws, streams, request_id=1):
-    subscribe_request = {
-        "method": "SUBSCRIBE",
-        "params": streams,
-        "id": request_id
-    }
-    await ws.send(json.dumps(subscribe_request))
-    print(f"[Sent] SUBSCRIBE request ID={request_id}, Count={len(streams)}")
+def build_stream_requests(method, streams, first_id=1):
+    """
+    Pre-serializes one `method` request (SUBSCRIBE/UNSUBSCRIBE) per SUBSCRIBE_CHUNK
+    streams, so (re)connect paths only send ready-made payloads.
+    Returns a list of (request_id, stream_count, payload) tuples.
+    """
+    requests = []
+    for request_id, start in enumerate(range(0, len(streams), SUBSCRIBE_CHUNK), start=first_id):
+        chunk = list(streams[start:start + SUBSCRIBE_CHUNK])
+        payload = orjson.dumps({"method": method, "params": chunk, "id": request_id})
+        # Sent as a text frame, hence str rather than bytes
+        requests.append((request_id, len(chunk), payload.decode()))
+    return requests
+
+async def subscribe_to_streams(ws, request):
+    request_id, count, payload = request
+    await ws.send(payload)
+    print(f"[Sent] SUBSCRIBE request ID={request_id}, Count={count}")
     await asyncio.sleep(1) 
 
-async def unsubscribe_from_streams(ws, streams, request_id=2):
-    unsubscribe_request = {
-        "method": "UNSUBSCRIBE",
-        "params": streams,
-        "id": request_id
-    }
-    await ws.send(json.dumps(unsubscribe_request))
-    print(f"[Sent] UNSUBSCRIBE request ID={request_id}, Count={len(streams)}")
+async def unsubscribe_from_streams(ws, request):
+    request_id, count, payload = request
+    await ws.send(payload)
+    print(f"[Sent] UNSUBSCRIBE request ID={request_id}, Count={count}")
     await asyncio.sleep(1)
 
-async def websocket_handler(symbols_slice, name, global_data, global_start_time):
+async def websocket_handler(streams, subscribe_requests, unsubscribe_requests, name, global_data, global_start_time):
     """
-    Handles a single WebSocket connection for the given slice of symbols.
-    Subscribes to trade streams, counts messages, prints throughput each second,
-    and accumulates that throughput into `global_data`.
+    Handles a single WebSocket connection for the given tuple of trade streams.
+    Sends the pre-serialized subscribe requests, counts messages, prints throughput
+    each second, and accumulates that throughput into `global_data`.
     """
-    stream_list = [f"{symbol.lower()}@trade" for symbol in symbols_slice]
-    print(f"[{name}] Attempting to connect. Symbol count: {len(stream_list)}")
+    print(f"[{name}] Attempting to connect. Symbol count: {len(streams)}")
 
     try:
         async with websockets.connect(BINANCE_WS_URL) as ws:
-            await subscribe_to_streams(ws, stream_list[0:300], request_id=1)
-            await subscribe_to_streams(ws, stream_list[300:600], request_id=2)
-            await subscribe_to_streams(ws, stream_list[600:1000], request_id=3)
+            for request in subscribe_requests:
+                await subscribe_to_streams(ws, request)
 
             message_count = 0
             local_start_time = time.time()
@@ -53,11 +60,8 @@ async def websocket_handler(symbols_slice, name, global_data, global_start_time)
                     await ws.pong(message)  # Respond with same payload
                     continue
 
-                try:
-                    message_count += 1
-                except json.JSONDecodeError:
-                    print(f"[{name}] Received non-JSON message: {message}")
-                    continue
+                # Only the message rate is measured: frames are counted, not parsed
+                message_count += 1
 
                 current_time = time.time()
                 if current_time - local_start_time >= 1.0:
@@ -68,7 +72,8 @@ async def websocket_handler(symbols_slice, name, global_data, global_start_time)
                     # Aggregate into global_data
                     # We sum across connections by storing them all in one bucket.
                     # Each connection adds its per-second count to the same second key.
-                    global_data[elapsed_sec] = global_data.get(elapsed_sec, 0) + message_count
+                    # No lock needed: all tasks share a single-threaded event loop.
+                    global_data[elapsed_sec] += message_count
 
                     message_count = 0
                     local_start_time = current_time
@@ -77,57 +82,67 @@ async def websocket_handler(symbols_slice, name, global_data, global_start_time)
         print(f"\n[{name}] Task cancelled. Cleaning up WebSocket...")
         # Attempt graceful unsubscribe
         async with websockets.connect(BINANCE_WS_URL) as ws:
-            await unsubscribe_from_streams(ws, stream_list[0:300], request_id=4)
-            await unsubscribe_from_streams(ws, stream_list[300:600], request_id=5)
-            await unsubscribe_from_streams(ws, stream_list[600:1000], request_id=6)
+            for request in unsubscribe_requests:
+                await unsubscribe_from_streams(ws, request)
         print(f"[{name}] WebSocket connection closed.")
         raise  # re-raise so higher-level code knows the task is cancelled
 
 async def main():
     # Read symbols from your file
-    df = pd.read_csv("binance/resources/trading_volumes.csv")
-    all_symbols = df["Symbol"].tolist()
+    with open("binance/resources/trading_volumes.csv", newline="") as f:
+        reader = csv.DictReader(f)
+        all_symbols = [row["Symbol"] for row in reader]
 
     # 3 slices of up to 1,000 each
     slice1 = all_symbols[0:1000]
     slice2 = all_symbols[1000:2000]
     slice3 = all_symbols[2000:3000]
 
-    # A shared dictionary to accumulate results across all connections.
+    # Stream names and request payloads are built once, up front
+    connections = []
+    for i, symbols_slice in enumerate((slice1, slice2, slice3), start=1):
+        streams = tuple(f"{symbol.lower()}@trade" for symbol in symbols_slice)
+        subscribe_requests = build_stream_requests("SUBSCRIBE", streams)
+        unsubscribe_requests = build_stream_requests("UNSUBSCRIBE", streams, first_id=len(subscribe_requests) + 1)
+        connections.append((streams, subscribe_requests, unsubscribe_requests, f"Connection{i}"))
+
+    # A shared counter to accumulate results across all connections.
     # Key: elapsed second (int), Value: sum of messages from all connections in that second.
-    global_data = {}
+    global_data = collections.Counter()
 
     # We'll record when all tasks start, to have a common "zero" time reference
     global_start_time = time.time()
 
     # Create three tasks, each with its own WebSocket connection
-    task1 = asyncio.create_task(websocket_handler(slice1, "Connection1", global_data, global_start_time))
-    task2 = asyncio.create_task(websocket_handler(slice2, "Connection2", global_data, global_start_time))
-    task3 = asyncio.create_task(websocket_handler(slice3, "Connection3", global_data, global_start_time))
+    tasks = [
+        asyncio.create_task(websocket_handler(streams, sub, unsub, name, global_data, global_start_time))
+        for streams, sub, unsub, name in connections
+    ]
 
     # Run them concurrently until they're done or cancelled
     try:
-        await asyncio.gather(task1, task2, task3)
+        await asyncio.gather(*tasks)
     except asyncio.CancelledError:
         pass  # We'll handle cleanup below
     finally:
         # Once done (or on Ctrl+C), dump global_data to a CSV
-        times = sorted(global_data.keys())
-        counts = [global_data[t] for t in times]
-        output_df = pd.DataFrame({"time_sec": times, "messages_per_second": counts})
-        output_df.to_csv("binance/resources/aggregated_results.csv", index=False)
+        with open("binance/resources/aggregated_results.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time_sec", "messages_per_second"])
+            writer.writerows(sorted(global_data.items()))
         print("\n[Info] Results saved to aggregated_results.csv")
 
 if __name__ == "__main__":
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
     try:
-        loop.run_until_complete(main())
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
+    try:
+        # asyncio.run cancels the connection tasks on Ctrl+C, which runs
+        # their unsubscribe cleanup and the CSV dump in main()
+        asyncio.run(main())
     except KeyboardInterrupt:
-        print("\n[Info] KeyboardInterrupt received. Cancelling tasks...")
-        for t in asyncio.all_tasks(loop):
-            t.cancel()
-        loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(loop), return_exceptions=True))
-        print("[Info] Exiting cleanly.")
-    finally:
-        loop.close()
\ No newline at end of file
+        print("\n[Info] KeyboardInterrupt received. Tasks cancelled.")
+    print("[Info] Exiting cleanly.")
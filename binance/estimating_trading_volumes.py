@@ -1,32 +1,166 @@
-import requests # type: ignore
-from collections import defaultdict, deque
+import urllib3 # type: ignore
+from collections import defaultdict
+from pathlib import Path
 import concurrent.futures
+import gzip
+import os
+import sys
+import threading
+import time
+import numpy as np # type: ignore
 from tqdm import tqdm # type: ignore
-import json 
+import orjson # type: ignore
 import csv
 
-def api_get_call(url, headers = {}, querystring = {}):
+try:
+    from numba import njit # type: ignore
+except ImportError:  # numba is optional, bfs_rates then runs as plain Python
+    njit = None
+
+# Shared keep-alive pool: the ThreadPoolExecutor workers reuse pooled
+# connections instead of opening a new TCP+TLS connection per request.
+# urllib3 is used directly, without the requests wrapper (hooks, cookiejar,
+# PreparedRequest copies) that otherwise dominates the per-call overhead.
+# maxsize must be >= the number of worker threads.
+# Retries are done by api_get_call itself (retries=False here), so that every
+# attempt is counted against the weight budget.
+HTTP = urllib3.PoolManager(num_pools=2, maxsize=20, retries=False, timeout=10)
+
+# urllib3 does not send Accept-Encoding on its own (requests did): without it
+# the ~1 MB /ticker/24hr and exchangeInfo bodies come back uncompressed.
+# Merged into every request's headers; response.data is decoded transparently.
+DEFAULT_HEADERS = urllib3.make_headers(accept_encoding=True)
+
+# Retried statuses; a 429 waits for the Retry-After header sent by Binance.
+# 418 (IP auto-ban) is never retried: requests during a ban extend it.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.2
+
+# Request weights (Binance docs) of the endpoints we call; unknown endpoints count as 1
+ENDPOINT_WEIGHT = {
+    "https://api.binance.com/api/v3/exchangeInfo": 20,
+    "https://api.binance.com/api/v3/ticker/price": 4,   # all symbols
+    "https://api.binance.com/api/v3/ticker/24hr": 80,   # all symbols
+}
+
+class WeightBudget:
+    """
+    Client-side view of Binance's per-minute request weight budget.
+    Workers acquire() an endpoint's weight before sending and block until the
+    current minute has room; update() resyncs with the X-MBX-USED-WEIGHT-1M
+    header returned by the server.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.minute = int(time.time() // 60)
+        self.cond = threading.Condition()
+
+    def _roll(self):
+        minute = int(time.time() // 60)
+        if minute != self.minute:
+            self.minute = minute
+            self.used = 0
+            self.cond.notify_all()
+
+    def acquire(self, weight):
+        with self.cond:
+            self._roll()
+            while self.used + weight > self.limit:
+                self.cond.wait(timeout=60 - time.time() % 60)
+                self._roll()
+            self.used += weight
+
+    def update(self, used):
+        with self.cond:
+            self._roll()
+            self.used = max(self.used, used)
+
+WEIGHT_BUDGET = WeightBudget(limit=1200)
+
+def api_get_call(url, headers = {}, querystring = {}, weight=1):
     """
     Sends a request to the Binance API and returns the response.
+    Waits for `weight` units of the per-minute budget before each attempt;
+    connection errors and RETRY_STATUSES are retried up to MAX_RETRIES times
+    with exponential backoff (or the server's Retry-After).
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        retries_left = attempt < MAX_RETRIES
+        backoff = BACKOFF_FACTOR * 2 ** attempt
+
+        WEIGHT_BUDGET.acquire(weight)
+        try:
+            response = HTTP.request("GET", url, fields=querystring, headers={**DEFAULT_HEADERS, **headers})
+        except urllib3.exceptions.HTTPError as err:
+            if retries_left:
+                time.sleep(backoff)
+                continue
+            print(f"Request Error: {err}")
+            return None
+
+        used_weight = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        if used_weight is not None and used_weight.isdigit():
+            WEIGHT_BUDGET.update(int(used_weight))
+
+        if response.status == 418:
+            print(f"HTTP Error: 418 IP banned for url: {url} (Retry-After: {response.headers.get('Retry-After')}s)")
+            return None
+        if response.status in RETRY_STATUSES and retries_left:
+            retry_after = response.headers.get("Retry-After")
+            time.sleep(int(retry_after) if retry_after is not None and retry_after.isdigit() else backoff)
+            continue
+        if response.status >= 400:
+            print(f"HTTP Error: {response.status} {response.reason} for url: {url}")
+            return None
+
+        try:
+            # orjson parses the raw bytes directly (the bulk /ticker/24hr body is ~1 MB)
+            return orjson.loads(response.data)
+        except orjson.JSONDecodeError as err:
+            print(f"Invalid JSON from {url}: {err}")
+            return None
+
+# On-disk cache of the raw bulk responses, with a time-to-live per endpoint (seconds)
+CACHE_DIR = Path("binance/resources/cache")
+CACHE_TTL = {
+    "https://api.binance.com/api/v3/exchangeInfo": 3600,
+    "https://api.binance.com/api/v3/ticker/price": 60,
+    "https://api.binance.com/api/v3/ticker/24hr": 60,
+}
+
+def cached_api_get_call(url):
+    """
+    api_get_call backed by a gzip JSON file in CACHE_DIR, reused while younger
+    than the endpoint's CACHE_TTL. Failed calls are not cached.
     """
+    path = CACHE_DIR / (url.rsplit("/api/v3/", 1)[-1].replace("/", "_") + ".json.gz")
     try:
-        response = requests.get(url, headers=headers, params=querystring)
-        response.raise_for_status() 
-        return response.json()
-
-    except requests.exceptions.HTTPError as err:
-        print(f"HTTP Error: {err}")
-        return None
-    except requests.exceptions.RequestException as err:
-        print(f"Request Error: {err}")
-        return None
+        if time.time() - path.stat().st_mtime < CACHE_TTL.get(url, 0):
+            with gzip.open(path, "rb") as f:
+                return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        pass  # missing, expired or corrupt: refetch
+
+    data = api_get_call(url, weight=ENDPOINT_WEIGHT.get(url, 1))
+    if data is not None:
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            with gzip.open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(data))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Error writing cache file {path}: {e}")
+    return data
 
 def get_exchange_info_symbols():
     """
     Return the *full* array of symbols from the exchangeInfo endpoint.
     That means each element has {baseAsset, quoteAsset, symbol, ...}
     """
-    exchange_info = api_get_call("https://api.binance.com/api/v3/exchangeInfo")
+    exchange_info = cached_api_get_call("https://api.binance.com/api/v3/exchangeInfo")
     # Return the raw "symbols" list
     return exchange_info["symbols"]
 
@@ -36,18 +170,26 @@ def extract_symbols_ticker(exchange_info_symbols):
     """
     return {s["symbol"]: s["quoteAsset"] for s in exchange_info_symbols}
 
-def save_json(data, filename):
+def save_json(data, filename, indent=True):
     """
-    Saves data as a JSON file.
+    Saves data as a JSON file (indented unless `indent` is False, for machine-only artifacts).
     """
     try:
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=4)
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0))
         print(f"✅ Data saved in {filename}")
         
     except Exception as e:
         print(f"⚠️ Error saving file: {e}")
 
+# symbol_data field -> CSV header
+CSV_COLUMNS = {
+    "quote_asset": "Quote Asset",
+    "quote_price": "Quote Price in USDT",
+    "quote_volume": "24h Quote Volume",
+    "volume_usd": "24h Volume in USD",
+}
+
 def save_csv(data, filename):
     """
     Saves data to a CSV file.
@@ -55,69 +197,54 @@ def save_csv(data, filename):
     try:
         with open(filename, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(["Symbol", "Quote Asset", "Quote Price in USDT", "24h Quote Volume", "24h Volume in USD"])
-            
-            for symbol, values in data.items():
-                writer.writerow([symbol, values["quote_asset"], values["quote_price"], values["quote_volume"], values["volume_usd"]])
-        
+            writer.writerow(["Symbol", *CSV_COLUMNS.values()])
+            # One writerows call over a generator (rows keep the order of `data`)
+            writer.writerows((symbol, *(values[field] for field in CSV_COLUMNS)) for symbol, values in data.items())
+
         print(f"✅ CSV saved as {filename}")
     except Exception as e:
         print(f"⚠️ Error saving CSV file: {e}")
 
 
 
-def fetch_symbol_price(symbol_dict):
+def fetch_all_prices():
     """
-    Fetches the price for one symbol (base->quote).
-    
+    Fetches the last price of every symbol in a single bulk call
+    (/api/v3/ticker/price without a symbol parameter).
+
     Returns:
-        (base, quote, price) or None if request fails.
+        {symbol: price}
     """
-    base = symbol_dict["baseAsset"]
-    quote = symbol_dict["quoteAsset"]
-    symbol_name = symbol_dict["symbol"]
-
-    try:
-        ticker_data = api_get_call(f"https://api.binance.com/api/v3/ticker/price?symbol={symbol_name}")
-        if ticker_data:
-            try:
-                price = float(ticker_data["price"])
-            except (KeyError, ValueError, TypeError):
-                price = 0.0
-            return (base, quote, price)
-    except requests.exceptions.RequestException:
-        pass
-
-    return (base, quote, 0.0)
+    prices = {}
+    for ticker_data in cached_api_get_call("https://api.binance.com/api/v3/ticker/price") or []:
+        try:
+            prices[ticker_data["symbol"]] = float(ticker_data["price"])
+        except (KeyError, ValueError, TypeError):
+            continue
+    return prices
 
-def build_graph(full_symbols_list):
+def build_graph(full_symbols_list, prices=None):
     """
     Builds a graph from the full exchange info list of symbol dicts.
     graph[baseAsset][quoteAsset] = price
-    graph[quoteAsset][baseAsset] = 1/price
+    Only forward edges are stored; reciprocals are computed lazily by the BFS.
+    `prices` ({symbol: price}) is fetched in bulk if not provided.
     """
-    graph = defaultdict(dict)
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_symbol = {
-            executor.submit(fetch_symbol_price, s): s
-            for s in full_symbols_list
-        }
-        
-        for future in tqdm(concurrent.futures.as_completed(future_to_symbol), total=len(full_symbols_list), desc="Building graph"):
-            symbol_dict = future_to_symbol[future]
-            base = symbol_dict["baseAsset"]
-            quote = symbol_dict["quoteAsset"]
-
-            try:
-                base_fetched, quote_fetched, price = future.result()
-                graph[base_fetched][quote_fetched] = price
-                if price != 0:
-                    graph[quote_fetched][base_fetched] = 1.0 / price
-
-            except Exception as e:
-                print(f"⚠️ Error processing symbol {symbol_dict['symbol']}: {e}")
-                graph[base][quote] = 0.0  # default
+    if prices is None:
+        prices = fetch_all_prices()
+    graph = {}
+
+    for symbol_dict in tqdm(full_symbols_list, desc="Building graph", mininterval=0.5, miniters=max(1, len(full_symbols_list) // 100)):
+        # Interned once here, so every later dict lookup on an asset code
+        # (graph, ids, rates) hits the identity fast path
+        base = sys.intern(symbol_dict["baseAsset"])
+        quote = sys.intern(symbol_dict["quoteAsset"])
+        price = prices.get(symbol_dict["symbol"], 0.0)
+
+        edges = graph.get(base)
+        if edges is None:
+            graph[base] = edges = {}
+        edges[quote] = price
 
     return graph
 
@@ -127,8 +254,8 @@ def load_graph(filename):
     Returns a defaultdict(dict) graph structure.
     """
     try:
-        with open(filename, 'r') as f:
-            data = json.load(f)
+        with open(filename, 'rb') as f:
+            data = orjson.loads(f.read())
 
         graph = defaultdict(dict, {k: dict(v) for k, v in data.items()})
 
@@ -138,62 +265,125 @@ def load_graph(filename):
         print(f"⚠️ Error loading graph file: {e}")
         return defaultdict(dict) 
 
-def bfs_conversion(graph, start_asset, end_asset="USDT"):
-    """
-    Find any path from start_asset -> end_asset in the graph,
-    multiplying along the way. If no path, return 0.
+def graph_to_csr(graph):
     """
-    if start_asset == end_asset:
-        return 1.0
-    
-    visited = set()
-    queue = deque([(start_asset, 1.0)]) 
+    Converts the dict-of-dicts graph to Compressed-Sparse-Row arrays, the layout
+    the reverse BFS from USDT walks: row a lists every n reachable from a, with
+    weight = price of n in a (1 n = weight * rate[a]), or, when only graph[a][n]
+    is priced, weight = graph[a][n] and divide = True (1 n = rate[a] / weight).
 
-    while queue:
-        current_asset, rate_so_far = queue.popleft()
-        if current_asset == end_asset:
-            return rate_so_far
-        if current_asset in visited:
-            continue
-        visited.add(current_asset)
-
-        # Explore neighbors
-        for neighbor, edge_rate in graph[current_asset].items():
-            if edge_rate and neighbor not in visited:
-                # Multiply the current rate by the edge rate
-                queue.append((neighbor, rate_so_far * edge_rate))
+    Returns:
+        (ids, indptr, indices, weights, divide): ids maps asset -> row index.
+    """
+    ids = {}
+    for asset, edges in graph.items():
+        ids.setdefault(asset, len(ids))
+        for neighbor in edges:
+            ids.setdefault(neighbor, len(ids))
+
+    incoming = [[] for _ in range(len(ids))]
+    for asset, edges in graph.items():
+        for neighbor, price in edges.items():
+            if not price:
+                continue
+            incoming[ids[neighbor]].append((ids[asset], price, False))
+            if not graph.get(neighbor, {}).get(asset):
+                incoming[ids[asset]].append((ids[neighbor], price, True))
+
+    indptr = np.zeros(len(ids) + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum([len(row) for row in incoming])
+    indices = np.fromiter((n for row in incoming for n, _, _ in row), dtype=np.int32, count=indptr[-1])
+    weights = np.fromiter((w for row in incoming for _, w, _ in row), dtype=np.float64, count=indptr[-1])
+    divide = np.fromiter((d for row in incoming for _, _, d in row), dtype=np.bool_, count=indptr[-1])
+    return ids, indptr, indices, weights, divide
+
+def bfs_rates(indptr, indices, weights, divide, source):
+    """
+    BFS over the CSR arrays from `source`; returns a float64 array with each
+    reachable asset's rate in `source` (0 where unreachable). Reciprocals are
+    only taken for the edges actually traversed.
+    """
+    n_assets = indptr.shape[0] - 1
+    rates = np.zeros(n_assets, dtype=np.float64)
+    visited = np.zeros(n_assets, dtype=np.bool_)
+    queue = np.empty(n_assets, dtype=np.int32)
+
+    rates[source] = 1.0
+    visited[source] = True
+    queue[0] = source
+    head, tail = 0, 1
+    while head < tail:
+        current = queue[head]
+        head += 1
+        for k in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[k]
+            if not visited[neighbor]:
+                visited[neighbor] = True
+                if divide[k]:
+                    rates[neighbor] = rates[current] / weights[k]
+                else:
+                    rates[neighbor] = weights[k] * rates[current]
+                queue[tail] = neighbor
+                tail += 1
+
+    return rates
+
+if njit is not None:
+    # Pure integer indexing + one multiply/divide per edge: compile it once
+    bfs_rates = njit(cache=True)(bfs_rates)
+
+def usdt_rates(graph, target_asset="USDT"):
+    """
+    Single reverse BFS from `target_asset` outward: returns {asset: rate in target_asset}
+    for every asset connected to it, in O(V+E) instead of one BFS per asset.
+    Runs on the CSR form of the graph (contiguous arrays, unboxed floats).
+    """
+    ids, indptr, indices, weights, divide = graph_to_csr(graph)
+    if target_asset not in ids:
+        return {target_asset: 1.0}
 
-    # If BFS fails, no path to USDT
-    return 0.0
+    rates = bfs_rates(indptr, indices, weights, divide, ids[target_asset])
+    return {asset: float(rates[i]) for asset, i in ids.items() if rates[i] != 0.0}
 
 def get_usdt_price_for_assets(assets, graph):
     """
-    For each asset in 'assets', do a BFS to get its price in USDT.
+    Get the price in USDT of each asset in 'assets' (0 if unreachable).
     """
-    prices = {}
-    for asset in set(assets):
-        prices[asset] = bfs_conversion(graph, asset, "USDT")
-    return prices
+    rates = usdt_rates(graph, "USDT")
+    return {asset: rates.get(asset, 0.0) for asset in set(assets)}
+
+def fetch_all_tickers_24h():
+    """
+    Fetches the 24hr ticker of every symbol in a single bulk call
+    (/api/v3/ticker/24hr without a symbol parameter; heavy weight, so call it once).
 
-def fetch_symbol_data(symbol, quote_asset, quotes_usdt_prices):
+    Returns:
+        {symbol: ticker_data}
     """
-    Fetch and process the symbol data (quoteVolume, volume in USD, etc.).
+    data = cached_api_get_call("https://api.binance.com/api/v3/ticker/24hr") or []
+    return {ticker_data["symbol"]: ticker_data for ticker_data in data if "symbol" in ticker_data}
+
+def fetch_symbol_data(symbol, quote_asset, rate, tickers):
     """
-    try:
-        ticker_data = api_get_call(f"https://api.binance.com/api/v3/ticker/24hr?symbol={symbol}")
-        if ticker_data:
+    Process the symbol data (quoteVolume, volume in USD, etc.) from the bulk 24hr tickers.
+    `rate` is the USDT price of `quote_asset`.
+    """
+    ticker_data = tickers.get(symbol)
+    if ticker_data:
+        try:
             quote_volume = float(ticker_data.get("quoteVolume", 0))
-            volume_in_usd = quote_volume * quotes_usdt_prices.get(quote_asset, 0)
-            
+        except (ValueError, TypeError):
+            print(f"⚠️ Invalid ticker data for {symbol}. Skipping.")
+        else:
+            volume_in_usd = quote_volume * rate
+
             return {
                 "quote_asset": quote_asset,
-                "quote_price": quotes_usdt_prices.get(quote_asset, 0),
+                "quote_price": rate,
                 "quote_volume": quote_volume,
                 "volume_usd": volume_in_usd
             }
-    except requests.exceptions.RequestException:
-        print(f"⚠️ Error fetching ticker data for {symbol}. Skipping.")
-    
+
     return {
         "quote_asset": quote_asset,
         "quote_price": 0,
@@ -201,55 +391,58 @@ def fetch_symbol_data(symbol, quote_asset, quotes_usdt_prices):
         "volume_usd": 0
     }
 
-def get_symbol_volume(symbols, quotes_usdt_prices): 
+def get_symbol_volume(symbols, quotes_usdt_prices, tickers=None): 
     """
-    Fetches the volume for each trading symbol in parallel.
+    Computes the volume for each trading symbol from one bulk 24hr ticker call
+    (`tickers`, fetched if not provided).
     """
+    if tickers is None:
+        tickers = fetch_all_tickers_24h()
     symbol_data = {}
 
-    # If max_workers omitted, Python uses a reasonable default (often # of CPUs * 5).
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_symbol = {
-            executor.submit(fetch_symbol_data, symbol, quote_asset, quotes_usdt_prices): symbol
-            for symbol, quote_asset in symbols.items()
-        }
-        
-        for future in tqdm(concurrent.futures.as_completed(future_to_symbol), total=len(symbols), desc="Fetching symbols"):
-            symbol = future_to_symbol[future]
-            try:
-                symbol_data[symbol] = future.result()
-            except Exception as e:
-                print(f"⚠️ An error occurred for symbol {symbol}: {e}")
-                symbol_data[symbol] = {
-                    "quote_asset": symbols[symbol],
-                    "quote_price": 0,
-                    "quote_volume": 0,
-                    "volume_usd": 0
-                }
+    for symbol, quote_asset in tqdm(symbols.items(), total=len(symbols), desc="Fetching symbols", mininterval=0.5, miniters=max(1, len(symbols) // 100)):
+        rate = quotes_usdt_prices.get(quote_asset, 0)
+        symbol_data[symbol] = fetch_symbol_data(symbol, quote_asset, rate, tickers)
+
     return symbol_data
 
+def fetch_market_data():
+    """
+    Issues the three independent bulk calls (exchangeInfo, all prices, all 24hr
+    tickers) concurrently over the shared HTTP connection pool.
+
+    Returns:
+        (exchange_info_symbols, prices, tickers)
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        exchange_info = executor.submit(get_exchange_info_symbols)
+        prices = executor.submit(fetch_all_prices)
+        tickers = executor.submit(fetch_all_tickers_24h)
+        return exchange_info.result(), prices.result(), tickers.result()
+
 if __name__ == "__main__":
     resources_folder = "binance/resources/"
 
-    print("🔄 Fetching symbols...")
-    exchange_info = get_exchange_info_symbols()
+    print("🔄 Fetching symbols, prices and 24h tickers...")
+    exchange_info, prices, tickers = fetch_market_data()
 
     symbols = extract_symbols_ticker(exchange_info)
     save_json(symbols, resources_folder + "symbols.json")
 
     print("🔄 Building the conversion graph...")
-    graph = build_graph(exchange_info)
-    save_json(graph, resources_folder + "graph.json")
-    
-    print("🔄 Loading the graph...")
-    graph = load_graph(resources_folder + "graph.json")
-
-    print("🔄 Calculating quote USD price from the graph...")
-    quotes_usdt_prices = get_usdt_price_for_assets(symbols.values(), graph)
+    graph = build_graph(exchange_info, prices)
+
+    # Keep the in-memory graph; persisting it is a side-effect done in the
+    # background while the BFS runs (the BFS only reads the graph).
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as writer:
+        writer.submit(save_json, graph, resources_folder + "graph.json", indent=False)
+
+        print("🔄 Calculating quote USD price from the graph...")
+        quotes_usdt_prices = get_usdt_price_for_assets(symbols.values(), graph)
     save_json(quotes_usdt_prices, resources_folder + "quotes_usdt_prices.json")
 
     print("🔄 Calculating symbol volumes in USD...")
-    symbol_volumes = get_symbol_volume(symbols, quotes_usdt_prices)
+    symbol_volumes = get_symbol_volume(symbols, quotes_usdt_prices, tickers)
     save_json(symbol_volumes, resources_folder +  "symbol_volumes.json")
 
     print("🔄 Saving results to CSV...")
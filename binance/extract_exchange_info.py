@@ -1,14 +1,10 @@
+import ijson
 import requests
 import json
 
 # URL for Binance exchange information
 API_URL = "https://api.binance.com/api/v3/exchangeInfo"
 
-# Fetch exchange information from Binance API
-response = requests.get(API_URL)
-response.raise_for_status()
-exchange_info = response.json()
-
 # Prepare a dictionary to hold symbol factors
 tick_step_factors = []
 
@@ -18,37 +14,43 @@ def significant_factor(decimal_str):
     Given a string like '0.00000100', returns the factor = position of first non-zero
     character after the decimal point (1-based).
     """
-    if '.' not in decimal_str:
+    _, sep, frac = decimal_str.partition('.')
+    if not sep:
         return 0
-    _, frac = decimal_str.split('.')
-    for idx, ch in enumerate(frac):
-        if ch != '0':
-            return idx + 1
-    return 0
-
-# Iterate through each symbol in the exchange information
-for item in exchange_info.get('symbols', []):
-    symbol = item.get('symbol')
-    tick_str = None
-    step_str = None
-
-    # Each symbol has a list of filters; we want PRICE_FILTER and LOT_SIZE
-    for f in item.get('filters', []):
-        filter_type = f.get('filterType')
-        if filter_type == 'PRICE_FILTER':
-            tick_str = f.get('tickSize')
-        elif filter_type == 'LOT_SIZE':
-            step_str = f.get('stepSize')
-
-    # Compute factors if values exist
-    if tick_str is not None and step_str is not None:
-        tick_factor = significant_factor(tick_str)
-        step_factor = significant_factor(step_str)
-        tick_step_factors.append({
-            'tickvalueFactor': tick_factor,
-            'stepSizeFactor': step_factor,
-            'symbol': symbol
-        })
+    stripped = frac.lstrip('0')
+    return len(frac) - len(stripped) + 1 if stripped else 0
+
+# Fetch exchange information from Binance API over a gzip keep-alive session and
+# stream the 'symbols' array with ijson instead of loading the whole body first
+with requests.Session() as session:
+    session.headers.update({'Accept-Encoding': 'gzip'})
+    response = session.get(API_URL, timeout=30, stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True  # let urllib3 gunzip the raw stream
+
+    # Iterate through each symbol in the exchange information
+    for item in ijson.items(response.raw, 'symbols.item'):
+        symbol = item.get('symbol')
+        tick_str = None
+        step_str = None
+
+        # Each symbol has a list of filters; we want PRICE_FILTER and LOT_SIZE
+        for f in item.get('filters', []):
+            filter_type = f.get('filterType')
+            if filter_type == 'PRICE_FILTER':
+                tick_str = f.get('tickSize')
+            elif filter_type == 'LOT_SIZE':
+                step_str = f.get('stepSize')
+
+        # Compute factors if values exist
+        if tick_str is not None and step_str is not None:
+            tick_factor = significant_factor(tick_str)
+            step_factor = significant_factor(step_str)
+            tick_step_factors.append({
+                'tickvalueFactor': tick_factor,
+                'stepSizeFactor': step_factor,
+                'symbol': symbol
+            })
 
 # Write the resulting data to a JSON file
 output_filename = 'symbol_factors.json'
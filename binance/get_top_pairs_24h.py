@@ -1,5 +1,8 @@
+import heapq
+import ijson
 import requests
 import sys
+from operator import itemgetter
 import yaml
 from typing import Set, List
 
@@ -47,35 +50,39 @@ def get_top_pairs(top_n: int = 50) -> List[str]:
     filtered to Spot symbols that are actively TRADING.
     """
     with requests.Session() as session:
+        session.headers.update({"Accept-Encoding": "gzip"})
+
         # 1) Build the allowlist from exchangeInfo
         trading_spot = get_trading_spot_symbols(session)
 
-        # 2) Retrieve 24h ticker for all symbols
+        # 2) Retrieve 24h ticker for all symbols, streamed item by item
         url = f"{BINANCE_REST}/api/v3/ticker/24hr"
-        r = session.get(url, timeout=30)
+        r = session.get(url, timeout=30, stream=True)
         r.raise_for_status()
-        data = r.json()
+        r.raw.decode_content = True  # let urllib3 gunzip the raw stream
+        data = ijson.items(r.raw, "item")
 
-        # 3) Filter out non-TRADING Spot symbols (and also keep count > 0)
-        filtered = []
+        # 3) Keep TRADING Spot symbols with count > 0, as (count, symbol) pairs
+        #    so 'count' is converted to int only once
+        pairs = []
         for x in data:
             sym = x.get("symbol")
             if sym not in trading_spot:
                 continue
-            # Optional safety: ignore fully inactive tickers
             try:
-                if int(x.get("count", 0)) <= 0:
-                    continue
+                count = int(x.get("count", 0))
             except (TypeError, ValueError):
                 continue
-            filtered.append(x)
+            # Optional safety: ignore fully inactive tickers
+            if count > 0:
+                pairs.append((count, sym))
 
-        # 4) Sort by number of trades in the last 24h (count), desc
-        sorted_pairs = sorted(filtered, key=lambda x: int(x["count"]), reverse=True)
+        # 4) Top N by number of trades in the last 24h (count), desc.
+        #    nlargest is O(N log K) and keeps the order of sorted(..., reverse=True)[:N]
+        top_n_pairs = heapq.nlargest(top_n, pairs, key=itemgetter(0))
 
         # 5) Return top N symbols
-        top_n_pairs = sorted_pairs[:top_n]
-        return [pair["symbol"] for pair in top_n_pairs]
+        return [sym for _, sym in top_n_pairs]
 
 
 def display_top_pairs_yaml(top_pairs: List[str]) -> str:
@@ -2,11 +2,13 @@
 """
 orderbook_local.py
 
-Quick, dependency-free script to:
+Quick script (dependencies: sortedcontainers, ijson, orjson) to:
   1) Load an initial order book snapshot from a JSON file.
-  2) Apply a series of incremental depth updates (e.g., Binance-style) from a JSON file.
-  3) Store **in memory** the resulting book after each update (or every Nth update),
-     and optionally dump the collection to a JSON file.
+  2) Apply a series of incremental depth updates (e.g., Binance-style) from a JSON file,
+     streamed item by item so the updates file is never fully loaded in memory.
+  3) Capture the resulting book after each update (or every Nth update) and stream
+     each captured state straight into a JSON array dump file (nothing is accumulated
+     in memory).
 
 No databases, no production frills.
 
@@ -30,8 +32,16 @@ Semantics
 - For an update pair [price, qty]:
   - qty == "0" → remove that level from the book.
   - qty  > "0" → upsert that price level to the given quantity.
-- Internally, the book is kept as dicts of strings for exactness: {side: {price_str: qty_str}}.
-- When exporting/printing, sides are sorted: bids by descending price, asks by ascending price.
+- Internally, each side is a SortedDict keyed by Decimal price, with quantities kept as
+  the original strings: {side: SortedDict({Decimal(price): qty_str})}.
+- Snapshots are fully validated; updates take a fast path that assumes well-formed
+  Binance payloads and detects zero quantities by string comparison.
+- When exporting/printing, sides are read in order (bids by descending price, asks by
+  ascending price) and prices are converted back to strings with format(d, "f").
+- With --factors/--symbol, prices are instead keyed by int64-style integers scaled by
+  10**tickvalueFactor (from symbol_factors.json, see extract_exchange_info.py), so the
+  update path does no Decimal work at all. Prices are then printed with exactly
+  tickvalueFactor decimals.
 
 Usage
 -----
@@ -47,7 +57,14 @@ python orderbook_local.py --updates updates.json --final-only
 # 4) Gzipped files are supported
 python orderbook_local.py --snapshot snap.json.gz --updates upd.json.gz --dump states.json.gz
 
-# 5) Generate a single revert update (apply it on the final book to get back to the initial snapshot)
+# 5) Integer-scaled prices using the tick factors from extract_exchange_info.py
+python orderbook_local.py --updates updates.json --final-only --factors symbol_factors.json --symbol ETHUSDT
+
+# 6) Replay many captures in parallel (one process per file, up to os.cpu_count());
+#    --dump/--save-revert then name directories receiving <name>.states.json / <name>.revert.json
+python orderbook_local.py --snapshot snap.json --updates-glob 'captures/*.json.gz' --final-only --dump out/
+
+# 7) Generate a single revert update (apply it on the final book to get back to the initial snapshot)
 python orderbook_local.py --snapshot snapshots.json --updates updates.json --emit-revert
 # or save it to a file
 python orderbook_local.py --snapshot snapshots.json --updates updates.json --save-revert revert.json
@@ -56,10 +73,53 @@ python orderbook_local.py --snapshot snapshots.json --updates updates.json --sav
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import glob
 import gzip
+import itertools
 import json
+import os
 from decimal import Decimal, InvalidOperation
-from typing import Dict, List, Tuple, Any, Iterable, Optional
+from typing import Callable, Dict, List, NamedTuple, Tuple, Any, Iterable, Optional
+
+import ijson  # type: ignore
+import orjson  # type: ignore
+from sortedcontainers import SortedDict  # type: ignore
+
+Book = Dict[str, SortedDict]
+
+
+class PriceCodec(NamedTuple):
+    """How price strings become SortedDict keys, and back."""
+    to_key: Callable[[str], Any]
+    to_str: Callable[[Any], str]
+
+
+DECIMAL_PRICES = PriceCodec(Decimal, lambda d: format(d, "f"))
+
+
+def scaled_price_codec(tick_factor: int) -> PriceCodec:
+    """
+    Integer keys: price * 10**tick_factor. Exact as long as prices are multiples
+    of the tick size, which Binance guarantees; a price with non-zero digits
+    beyond tick_factor raises ValueError instead of being merged into another
+    level. Parsing is pure string slicing.
+    """
+    scale = 10 ** tick_factor
+
+    def to_key(p: str) -> int:
+        whole, _, frac = p.partition(".")
+        if frac[tick_factor:].strip("0"):
+            raise ValueError(f"Price {p} is not a multiple of the tick size (tickvalueFactor={tick_factor})")
+        return int(whole + frac[:tick_factor].ljust(tick_factor, "0"))
+
+    def to_str(k: int) -> str:
+        if tick_factor == 0:
+            return str(k)
+        whole, frac = divmod(k, scale)
+        return f"{whole}.{frac:0{tick_factor}d}"
+
+    return PriceCodec(to_key, to_str)
 
 # ----------------------------- IO helpers ---------------------------------
 
@@ -69,6 +129,12 @@ def open_text(path: str, mode: str = "rt"):
     return open(path, mode=mode, encoding="utf-8")
 
 
+def open_binary(path: str, mode: str = "rb"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode=mode)
+    return open(path, mode=mode)
+
+
 def dump_text(obj: Any, path: str) -> None:
     if path.endswith(".gz"):
         with gzip.open(path, mode="wt", encoding="utf-8") as fp:
@@ -79,7 +145,7 @@ def dump_text(obj: Any, path: str) -> None:
 
 # ----------------------------- Parsing ------------------------------------
 
-def parse_levels(levels: Any, label: str) -> List[Tuple[str, str]]:
+def parse_levels_strict(levels: Any, label: str) -> List[Tuple[str, str]]:
     if levels is None:
         return []
     if not isinstance(levels, list):
@@ -102,6 +168,11 @@ def parse_levels(levels: Any, label: str) -> List[Tuple[str, str]]:
     return out
 
 
+def is_zero_qty(q: str) -> bool:
+    """True for zero quantities in any of Binance's forms ("0", "0.0", "0.00000000")."""
+    return not q.lstrip("0.")
+
+
 def iter_snapshots(obj: Any) -> Iterable[Dict[str, Any]]:
     if isinstance(obj, dict) and ("asks" in obj or "bids" in obj):
         yield obj
@@ -115,8 +186,17 @@ def iter_snapshots(obj: Any) -> Iterable[Dict[str, Any]]:
     raise ValueError("Snapshot JSON must be an object or a list of objects with 'asks'/'bids'.")
 
 
-def iter_depth_events(obj: Any) -> Iterable[Dict[str, List[List[str]]]]:
-    if not isinstance(obj, list):
+def stream_array_items(fp) -> Iterable[Any]:
+    """Incrementally yield the items of a top-level JSON array read from a binary file."""
+    events = ijson.parse(fp)
+    first = next(events, None)
+    if first is None or first[1] != "start_array":
+        raise ValueError("Updates JSON must be a list of objects.")
+    yield from ijson.items(itertools.chain([first], events), "item")
+
+
+def iter_depth_events(obj: Iterable[Any]) -> Iterable[Dict[str, List[List[str]]]]:
+    if isinstance(obj, (dict, str, bytes)):
         raise ValueError("Updates JSON must be a list of objects.")
     for i, item in enumerate(obj):
         if not isinstance(item, dict):
@@ -132,37 +212,47 @@ def iter_depth_events(obj: Any) -> Iterable[Dict[str, List[List[str]]]]:
 
 # ----------------------------- Book ops -----------------------------------
 
-def new_empty_book() -> Dict[str, Dict[str, str]]:
-    return {"ask": {}, "bid": {}}
+def new_empty_book() -> Book:
+    return {"ask": SortedDict(), "bid": SortedDict()}
 
 
-def book_from_snapshot(snap: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
-    asks = parse_levels(snap.get("asks", []), "asks")
-    bids = parse_levels(snap.get("bids", []), "bids")
+def copy_book(book: Book) -> Book:
+    return {"ask": book["ask"].copy(), "bid": book["bid"].copy()}
+
+
+def book_from_snapshot(snap: Dict[str, Any], codec: PriceCodec = DECIMAL_PRICES) -> Book:
+    asks = parse_levels_strict(snap.get("asks", []), "asks")
+    bids = parse_levels_strict(snap.get("bids", []), "bids")
     book = new_empty_book()
+    to_key = codec.to_key
     for p, q in asks:
-        book["ask"][p] = q
+        book["ask"][to_key(p)] = q
     for p, q in bids:
-        book["bid"][p] = q
+        book["bid"][to_key(p)] = q
     return book
 
 
-def apply_event(book: Dict[str, Dict[str, str]], event: Dict[str, List[List[str]]]) -> None:
+def apply_event(book: Book, event: Dict[str, List[List[str]]], codec: PriceCodec = DECIMAL_PRICES) -> None:
+    # Hot path: no per-level validation (see parse_levels_strict for snapshots);
+    # only the price is parsed, as the SortedDict key.
+    to_key = codec.to_key
     # Bids
-    for p, q in parse_levels(event.get("b"), "bids"):
-        if Decimal(q) == 0:
-            book["bid"].pop(p, None)
+    bids = book["bid"]
+    for p, q in event["b"]:
+        if is_zero_qty(q):
+            bids.pop(to_key(p), None)
         else:
-            book["bid"][p] = q
+            bids[to_key(p)] = q
     # Asks
-    for p, q in parse_levels(event.get("a"), "asks"):
-        if Decimal(q) == 0:
-            book["ask"].pop(p, None)
+    asks = book["ask"]
+    for p, q in event["a"]:
+        if is_zero_qty(q):
+            asks.pop(to_key(p), None)
         else:
-            book["ask"][p] = q
+            asks[to_key(p)] = q
 
 
-def generate_revert_update(current_book: Dict[str, Dict[str, str]], target_book: Dict[str, Dict[str, str]], zero_fmt: str = "0.00000000") -> Dict[str, Any]:
+def generate_revert_update(current_book: Book, target_book: Book, zero_fmt: str = "0.00000000", codec: PriceCodec = DECIMAL_PRICES) -> Dict[str, Any]:
     """
     Build a single depthUpdate event that, when applied to `current_book`, yields `target_book`.
 
@@ -175,24 +265,16 @@ def generate_revert_update(current_book: Dict[str, Dict[str, str]], target_book:
     def side_diff(side: str) -> List[List[str]]:
         cur = current_book[side]
         tgt = target_book[side]
-        out: List[List[str]] = []
-        # Removals and changes
-        for p, q_cur in cur.items():
-            q_tgt = tgt.get(p)
-            if q_tgt is None:
-                out.append([p, zero_fmt])  # remove
-            elif q_tgt != q_cur:
-                out.append([p, q_tgt])     # change
-        # Additions
-        for p, q_tgt in tgt.items():
-            if p not in cur:
-                out.append([p, q_tgt])
+        # Set algebra on C-level dict key views (SortedDict is a dict subclass)
+        cur_keys = dict.keys(cur)
+        tgt_keys = dict.keys(tgt)
+        diff: List[Tuple[Any, Optional[str]]] = [(p, None) for p in cur_keys - tgt_keys]  # remove
+        diff += [(p, tgt[p]) for p in tgt_keys - cur_keys]                                # add
+        diff += [(p, tgt[p]) for p in cur_keys & tgt_keys if tgt[p] != cur[p]]            # change
         # Sort for readability (asks asc, bids desc)
-        if side == "ask":
-            out.sort(key=lambda pq: Decimal(pq[0]))
-        else:
-            out.sort(key=lambda pq: Decimal(pq[0]), reverse=True)
-        return out
+        diff.sort(key=lambda pq: pq[0], reverse=(side == "bid"))
+        to_str = codec.to_str
+        return [[to_str(p), zero_fmt if q is None else q] for p, q in diff]
 
     return {
         "data": {
@@ -203,26 +285,37 @@ def generate_revert_update(current_book: Dict[str, Dict[str, str]], target_book:
     }
 
 
-def sorted_side(book_side: Dict[str, str], side: str) -> List[Tuple[str, str]]:
+def sorted_side(book_side: SortedDict, side: str) -> List[Tuple[Any, str]]:
     if side == "ask":
-        prices = sorted(book_side.keys(), key=lambda s: Decimal(s))
-    else:
-        prices = sorted(book_side.keys(), key=lambda s: Decimal(s), reverse=True)
-    return [(p, book_side[p]) for p in prices]
+        return list(book_side.items())
+    return list(reversed(book_side.items()))
 
 
-def book_to_levels(book: Dict[str, Dict[str, str]]) -> Dict[str, List[List[str]]]:
+def book_to_levels(book: Book, codec: PriceCodec = DECIMAL_PRICES) -> Dict[str, List[List[str]]]:
+    to_str = codec.to_str
     return {
-        "asks": [[p, q] for p, q in sorted_side(book["ask"], "ask")],
-        "bids": [[p, q] for p, q in sorted_side(book["bid"], "bid")],
+        "asks": [[to_str(p), q] for p, q in sorted_side(book["ask"], "ask")],
+        "bids": [[to_str(p), q] for p, q in sorted_side(book["bid"], "bid")],
     }
 
+
+def load_tick_factor(path: str, symbol: str) -> int:
+    """Read `tickvalueFactor` for `symbol` from a symbol_factors.json file."""
+    with open_text(path) as fp:
+        payload = json.load(fp)
+    for item in payload.get("symbols", []):
+        if item.get("symbol") == symbol:
+            return int(item["tickvalueFactor"])
+    raise ValueError(f"Symbol {symbol} not found in {path}")
+
 # ----------------------------- CLI ----------------------------------------
 
 def main(argv: Optional[List[str]] = None) -> int:
     ap = argparse.ArgumentParser(description="Apply depth updates to an order book (in-memory)")
     ap.add_argument("--snapshot", default=None, help="Path to initial snapshot JSON (.json or .json.gz)")
-    ap.add_argument("--updates", required=True, help="Path to updates JSON (.json or .json.gz)")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--updates", help="Path to updates JSON (.json or .json.gz)")
+    src.add_argument("--updates-glob", help="Glob of updates files replayed in parallel, one process per file")
     ap.add_argument("--store-every", type=int, default=1, help="Store one state every N events (default: 1)")
     ap.add_argument("--final-only", action="store_true", help="Only keep the final state (overrides --store-every)")
     ap.add_argument("--print-top", type=int, default=0, help="Print top N levels of final book to stdout")
@@ -230,9 +323,75 @@ def main(argv: Optional[List[str]] = None) -> int:
     # Revert generation
     ap.add_argument("--emit-revert", action="store_true", help="Print a single depthUpdate that reverts the final book to the initial snapshot")
     ap.add_argument("--save-revert", default=None, help="Write the revert update JSON to this file (.json or .json.gz)")
+    # Integer-scaled prices
+    ap.add_argument("--factors", default=None, help="symbol_factors.json from extract_exchange_info.py; keys prices as scaled integers")
+    ap.add_argument("--symbol", default=None, help="Symbol to look up in --factors (e.g. ETHUSDT)")
 
     args = ap.parse_args(argv)
 
+    if args.factors and not args.symbol:
+        ap.error("--factors requires --symbol")
+
+    if args.updates_glob:
+        if args.emit_revert or args.print_top:
+            ap.error("--emit-revert/--print-top are not supported with --updates-glob")
+        return replay_many(args)
+    return process_one(args)
+
+
+def output_name(updates_path: str, suffix: str) -> str:
+    """'captures/ethusdt.json.gz' -> 'ethusdt' + suffix."""
+    name = os.path.basename(updates_path)
+    for ext in (".gz", ".json"):
+        if name.endswith(ext):
+            name = name[: -len(ext)]
+    return name + suffix
+
+
+def replay_many(args: argparse.Namespace) -> int:
+    """Run process_one on every file matching --updates-glob in a process pool."""
+    paths = sorted(glob.glob(args.updates_glob))
+    if not paths:
+        raise SystemExit(f"No updates files match {args.updates_glob}")
+    for directory in (args.dump, args.save_revert):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    jobs = []
+    for path in paths:
+        job = argparse.Namespace(**vars(args))
+        job.updates = path
+        job.updates_glob = None
+        if args.dump:
+            job.dump = os.path.join(args.dump, output_name(path, ".states.json"))
+        if args.save_revert:
+            job.save_revert = os.path.join(args.save_revert, output_name(path, ".revert.json"))
+        jobs.append(job)
+
+    # Workers share nothing; each one does its own I/O and replay.
+    exit_code = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        future_to_path = {executor.submit(process_one, job): job.updates for job in jobs}
+        for future in concurrent.futures.as_completed(future_to_path):
+            path = future_to_path[future]
+            try:
+                code = future.result()
+            except Exception as e:
+                print(f"{path}: failed: {e}")
+                code = 1
+            else:
+                print(f"{path}: done")
+            exit_code = max(exit_code, code)
+    return exit_code
+
+
+def process_one(args: argparse.Namespace) -> int:
+    """Replay a single updates file (args.updates) according to the CLI options."""
+    if args.factors:
+        codec = scaled_price_codec(load_tick_factor(args.factors, args.symbol))
+    else:
+        codec = DECIMAL_PRICES
+
     # --- Build initial book ---
     if args.snapshot:
         with open_text(args.snapshot) as fp:
@@ -242,33 +401,54 @@ def main(argv: Optional[List[str]] = None) -> int:
             pass
         if last_snap is None:
             raise SystemExit("Snapshot file contains no usable objects.")
-        initial_book = book_from_snapshot(last_snap)
+        initial_book = book_from_snapshot(last_snap, codec)
     else:
         initial_book = new_empty_book()
 
     # Work copy that will be mutated by updates
-    book = {"ask": dict(initial_book["ask"]), "bid": dict(initial_book["bid"]) }
+    book = copy_book(initial_book)
 
     # --- Apply updates ---
-    with open_text(args.updates) as fp:
-        upd_payload = json.load(fp)
-
-    states: List[Dict[str, List[List[str]]]] = []
-
-    if args.final_only:
-        for ev in iter_depth_events(upd_payload):
-            apply_event(book, ev)
-        states.append(book_to_levels(book))
-    else:
-        n = 0
-        for ev in iter_depth_events(upd_payload):
-            n += 1
-            apply_event(book, ev)
-            if n % max(1, args.store_every) == 0:
-                states.append(book_to_levels(book))
+    # Intermediate states are streamed into the dump as a JSON array, one
+    # element per stored state, so memory stays flat whatever --store-every is.
+    # It is written to a hidden temp file next to args.dump and only moved into
+    # place once the replay succeeded, so a failed replay leaves no truncated dump.
+    dump_fp = None
+    if args.dump and not args.final_only:
+        dump_dir, dump_name = os.path.split(args.dump)
+        tmp_dump = os.path.join(dump_dir, f".partial-{dump_name}")
+        dump_fp = open_binary(tmp_dump, "wb")
+        dump_fp.write(b"[")
+
+    try:
+        with open_binary(args.updates) as fp:
+            events = iter_depth_events(stream_array_items(fp))
+            if dump_fp is None:
+                for ev in events:
+                    apply_event(book, ev, codec)
+            else:
+                store_every = max(1, args.store_every)
+                n = 0
+                for ev in events:
+                    n += 1
+                    apply_event(book, ev, codec)
+                    if n % store_every == 0:
+                        if n != store_every:
+                            dump_fp.write(b",")
+                        dump_fp.write(orjson.dumps(book_to_levels(book, codec)))
+    except BaseException:
+        if dump_fp is not None:
+            dump_fp.close()
+            os.remove(tmp_dump)
+        raise
+
+    if dump_fp is not None:
+        dump_fp.write(b"]")
+        dump_fp.close()
+        os.replace(tmp_dump, args.dump)
 
     # --- Optional stdout summary (final state) ---
-    final = book_to_levels(book)
+    final = book_to_levels(book, codec)
     if args.print_top > 0:
         N = args.print_top
         print("Final top bids:")
@@ -278,15 +458,16 @@ def main(argv: Optional[List[str]] = None) -> int:
         for p, q in final["asks"][:N]:
             print(f"  {p}\t{q}")
 
-    # --- Optional dump of stored states ---
-    if args.dump:
-        dump_text(states, args.dump)
+    # --- Optional dump of the final state ---
+    if args.dump and args.final_only:
+        dump_text([final], args.dump)
 
     # --- Revert update generation (final -> initial) ---
     if args.emit_revert or args.save_revert:
         revert = generate_revert_update(
-            current_book={"ask": dict(book["ask"]), "bid": dict(book["bid"])},
-            target_book={"ask": dict(initial_book["ask"]), "bid": dict(initial_book["bid"])},
+            current_book=book,
+            target_book=initial_book,
+            codec=codec,
         )
         if args.emit_revert:
             print(json.dumps(revert, indent=2))